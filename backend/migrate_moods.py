@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+One-off maintenance for the mood_entries collection.
+
+Converts legacy ISO-string timestamps to BSON dates, then removes duplicate
+entries so the unique index on `date` can be built, keeping the most
+recently saved entry for each date.
+
+Usage (from the backend directory): python migrate_moods.py
+"""
+
+import os
+from datetime import datetime, timezone
+from pathlib import Path
+
+from dotenv import load_dotenv
+from pymongo import MongoClient, UpdateOne
+
+ROOT_DIR = Path(__file__).parent
+load_dotenv(ROOT_DIR / '.env')
+
+
+def convert_string_timestamps(collection, batch_size=1000):
+    """Rewrite ISO-string timestamps as BSON dates; returns the number converted"""
+    converted = 0
+    batch = []
+    for doc in collection.find({"timestamp": {"$type": "string"}}, {"timestamp": 1}):
+        timestamp = datetime.fromisoformat(doc["timestamp"])
+        if timestamp.tzinfo is None:
+            timestamp = timestamp.replace(tzinfo=timezone.utc)
+        batch.append(UpdateOne({"_id": doc["_id"]}, {"$set": {"timestamp": timestamp}}))
+        if len(batch) >= batch_size:
+            converted += collection.bulk_write(batch, ordered=False).modified_count
+            batch = []
+    if batch:
+        converted += collection.bulk_write(batch, ordered=False).modified_count
+    return converted
+
+
+def dedupe_by_date(collection):
+    """Delete all but the newest entry per date; returns the number removed"""
+    pipeline = [
+        {"$sort": {"timestamp": -1, "_id": -1}},
+        {"$group": {"_id": "$date", "ids": {"$push": "$_id"}, "count": {"$sum": 1}}},
+        {"$match": {"count": {"$gt": 1}}},
+    ]
+    removed = 0
+    for group in collection.aggregate(pipeline, allowDiskUse=True):
+        stale_ids = group["ids"][1:]
+        result = collection.delete_many({"_id": {"$in": stale_ids}})
+        print(f"{group['_id']}: kept newest entry, removed {result.deleted_count}")
+        removed += result.deleted_count
+    return removed
+
+
+def main():
+    client = MongoClient(os.environ['MONGO_URL'])
+    collection = client[os.environ['DB_NAME']].mood_entries
+
+    # Convert first so "newest per date" compares real dates
+    converted = convert_string_timestamps(collection)
+    print(f"Converted {converted} string timestamps to dates")
+
+    removed = dedupe_by_date(collection)
+    print(f"Removed {removed} duplicate mood entries")
+
+    collection.create_index("date", unique=True)
+    print("Unique index on date is in place")
+
+    client.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,45 +1,70 @@
-from fastapi import FastAPI, APIRouter, HTTPException
+from fastapi import FastAPI, APIRouter, HTTPException, Query
+from fastapi.responses import ORJSONResponse, StreamingResponse
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ReturnDocument, UpdateOne
+from pymongo.errors import (
+    BulkWriteError,
+    ConnectionFailure,
+    DuplicateKeyError,
+    OperationFailure,
+    PyMongoError,
+)
 import os
+import csv
+import io
 import logging
 from pathlib import Path
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field, field_validator
 from typing import List, Optional
 import uuid
 from datetime import datetime, timezone, date
+from functools import lru_cache
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
 # MongoDB connection
 mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
+client = AsyncIOMotorClient(
+    mongo_url,
+    tz_aware=True,
+    maxPoolSize=int(os.environ.get('MONGO_MAX_POOL', '50')),
+    minPoolSize=int(os.environ.get('MONGO_MIN_POOL', '5')),
+    maxIdleTimeMS=300000,
+    serverSelectionTimeoutMS=3000,
+    compressors=os.environ.get('MONGO_COMPRESSORS', 'zstd,zlib'),
+)
 db = client[os.environ['DB_NAME']]
 
 # Create the main app without a prefix
-app = FastAPI()
+app = FastAPI(default_response_class=ORJSONResponse)
 
 # Create a router with the /api prefix
 api_router = APIRouter(prefix="/api")
 
-# Define Models
-class MoodEntry(BaseModel):
-    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
-    mood: int  # 1-5 scale
-    mood_emoji: str
-    notes: Optional[str] = ""
-    date: str  # Store as ISO date string
-    timestamp: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+# Mood dates are stored as YYYY-MM-DD strings
+DATE_PATTERN = r"^\d{4}-\d{2}-\d{2}$"
 
+# Define Models
 class MoodEntryCreate(BaseModel):
-    mood: int
+    mood: int = Field(..., ge=1, le=5)
     mood_emoji: str
     notes: Optional[str] = ""
-    date: str
+    date: str = Field(..., pattern=DATE_PATTERN)
+
+    @field_validator("date")
+    @classmethod
+    def check_calendar_date(cls, value):
+        # The pattern only checks the shape; reject dates like 2025-02-30
+        date.fromisoformat(value)
+        return value
 
 class MoodEntryResponse(BaseModel):
+    # Built with model_construct from trusted DB documents; stray keys are dropped
+    model_config = ConfigDict(extra="ignore")
+
     id: str
     mood: int
     mood_emoji: str
@@ -47,16 +72,35 @@ class MoodEntryResponse(BaseModel):
     date: str
     timestamp: datetime
 
-# Helper function to prepare data for MongoDB
-def prepare_for_mongo(data):
-    if isinstance(data.get('timestamp'), datetime):
-        data['timestamp'] = data['timestamp'].isoformat()
-    return data
+# Fields returned to clients; keeps Mongo's _id out of every read
+MOOD_PROJECTION = {
+    "_id": 0,
+    "id": 1,
+    "mood": 1,
+    "mood_emoji": 1,
+    "notes": 1,
+    "date": 1,
+    "timestamp": 1,
+}
+
+# Sort order for the history listing, matched by an index created at startup
+MOOD_LIST_SORT = [("timestamp", -1), ("date", -1)]
+
+# Number of CSV rows buffered before each chunk of the export is sent
+CSV_CHUNK_ROWS = 500
+# Documents fetched per cursor round-trip while exporting
+CSV_BATCH_SIZE = 1000
+CSV_HEADER = ("Date", "Mood", "Emoji", "Notes", "Timestamp")
 
-def parse_from_mongo(item):
-    if isinstance(item.get('timestamp'), str):
-        item['timestamp'] = datetime.fromisoformat(item['timestamp'])
-    return item
+@lru_cache(maxsize=1)
+def csv_export_filename(export_date: date):
+    return f"mood_data_{export_date.strftime('%Y%m%d')}.csv"
+
+def format_timestamp(timestamp):
+    # Entries saved before the BSON date switch still hold ISO strings
+    if isinstance(timestamp, datetime):
+        return timestamp.isoformat()
+    return str(timestamp)
 
 # Routes
 @api_router.get("/")
@@ -65,97 +109,153 @@ async def root():
 
 @api_router.post("/moods", response_model=MoodEntryResponse)
 async def create_mood_entry(mood_data: MoodEntryCreate):
+    # Already validated by FastAPI, so build the document directly
+    mood_dict = mood_data.model_dump()
+    mood_dict['timestamp'] = datetime.now(timezone.utc)
+    
+    # One entry per day: overwrite that day's entry if present, keeping its id
+    result = await db.mood_entries.find_one_and_update(
+        {"date": mood_data.date},
+        {"$set": mood_dict, "$setOnInsert": {"id": str(uuid.uuid4())}},
+        upsert=True,
+        return_document=ReturnDocument.AFTER,
+        projection=MOOD_PROJECTION
+    )
+    
+    return MoodEntryResponse.model_construct(**result)
+
+@api_router.post("/moods/batch", response_model=List[MoodEntryResponse])
+async def create_mood_entries_batch(entries: List[MoodEntryCreate]):
+    if not entries:
+        return []
+    
+    # Same one-entry-per-day rule as create_mood_entry; within a batch the last entry for a date wins
+    timestamp = datetime.now(timezone.utc)
+    by_date = {entry.date: {**entry.model_dump(), 'timestamp': timestamp} for entry in entries}
+    operations = [
+        UpdateOne(
+            {"date": mood_date},
+            {"$set": mood_dict, "$setOnInsert": {"id": str(uuid.uuid4())}},
+            upsert=True
+        )
+        for mood_date, mood_dict in by_date.items()
+    ]
+    
     try:
-        mood_dict = mood_data.dict()
-        mood_obj = MoodEntry(**mood_dict)
-        
-        # Prepare data for MongoDB
-        mood_dict = prepare_for_mongo(mood_obj.dict())
-        
-        # Insert into database
-        result = await db.mood_entries.insert_one(mood_dict)
-        
-        if result.inserted_id:
-            return MoodEntryResponse(**mood_obj.dict())
-        else:
-            raise HTTPException(status_code=500, detail="Failed to create mood entry")
-            
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+        await db.mood_entries.bulk_write(operations, ordered=False)
+    except BulkWriteError as e:
+        errors = e.details.get('writeErrors', [])
+        if e.details.get('writeConcernErrors') or any(error['code'] != 11000 for error in errors):
+            raise
+        # A concurrent insert won the race for these dates; they exist now, so update them
+        await db.mood_entries.bulk_write([operations[error['index']] for error in errors], ordered=False)
+    
+    stored = await db.mood_entries.find(
+        {"date": {"$in": list(by_date)}}, MOOD_PROJECTION
+    ).to_list(length=len(by_date))
+    stored_by_date = {mood["date"]: mood for mood in stored}
+    return [
+        MoodEntryResponse.model_construct(**stored_by_date[mood_date])
+        for mood_date in by_date
+        if mood_date in stored_by_date
+    ]
 
 @api_router.get("/moods", response_model=List[MoodEntryResponse])
-async def get_mood_entries():
-    try:
-        # Get all mood entries, sorted by date descending
-        moods = await db.mood_entries.find().sort("timestamp", -1).to_list(length=None)
-        
-        # Parse from MongoDB and return
-        parsed_moods = [parse_from_mongo(mood) for mood in moods]
-        return [MoodEntryResponse(**mood) for mood in parsed_moods]
-        
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+async def get_mood_entries(
+    limit: int = Query(100, ge=1, le=1000),
+    skip: int = Query(0, ge=0),
+    date_from: Optional[str] = Query(None, pattern=DATE_PATTERN),
+    date_to: Optional[str] = Query(None, pattern=DATE_PATTERN)
+):
+    # ISO date strings compare in calendar order, so this can use the date index
+    query = {}
+    if date_from or date_to:
+        query["date"] = {}
+        if date_from:
+            query["date"]["$gte"] = date_from
+        if date_to:
+            query["date"]["$lte"] = date_to
+    
+    # Get a page of mood entries, newest first; date breaks timestamp ties
+    # (batch entries share one timestamp) so skip/limit pages stay stable
+    moods = await (
+        db.mood_entries.find(query, MOOD_PROJECTION, batch_size=limit)
+        .sort(MOOD_LIST_SORT)
+        .skip(skip)
+        .limit(limit)
+        .to_list(length=limit)
+    )
+    
+    # Documents come from our own writes, so skip re-validating each row
+    return [MoodEntryResponse.model_construct(**mood) for mood in moods]
 
 @api_router.get("/moods/{date}")
 async def get_mood_by_date(date: str):
-    try:
-        mood = await db.mood_entries.find_one({"date": date})
-        if mood:
-            parsed_mood = parse_from_mongo(mood)
-            return MoodEntryResponse(**parsed_mood)
-        return None
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    mood = await db.mood_entries.find_one({"date": date}, MOOD_PROJECTION)
+    if mood:
+        return MoodEntryResponse.model_construct(**mood)
+    return None
 
 @api_router.put("/moods/{mood_id}", response_model=MoodEntryResponse)
 async def update_mood_entry(mood_id: str, mood_data: MoodEntryCreate):
-    try:
-        mood_dict = mood_data.dict()
-        mood_dict['timestamp'] = datetime.now(timezone.utc).isoformat()
-        
-        result = await db.mood_entries.update_one(
-            {"id": mood_id},
-            {"$set": mood_dict}
-        )
-        
-        if result.modified_count == 1:
-            updated_mood = await db.mood_entries.find_one({"id": mood_id})
-            if updated_mood:
-                parsed_mood = parse_from_mongo(updated_mood)
-                return MoodEntryResponse(**parsed_mood)
-        
+    mood_dict = mood_data.model_dump()
+    mood_dict['timestamp'] = datetime.now(timezone.utc)
+    
+    updated_mood = await db.mood_entries.find_one_and_update(
+        {"id": mood_id},
+        {"$set": mood_dict},
+        return_document=ReturnDocument.AFTER,
+        projection=MOOD_PROJECTION
+    )
+    
+    if updated_mood is None:
         raise HTTPException(status_code=404, detail="Mood entry not found")
-        
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    
+    return MoodEntryResponse.model_construct(**updated_mood)
 
 @api_router.delete("/moods/{mood_id}")
 async def delete_mood_entry(mood_id: str):
-    try:
-        result = await db.mood_entries.delete_one({"id": mood_id})
-        if result.deleted_count == 1:
-            return {"message": "Mood entry deleted successfully"}
-        raise HTTPException(status_code=404, detail="Mood entry not found")
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    result = await db.mood_entries.delete_one({"id": mood_id})
+    if result.deleted_count == 1:
+        return {"message": "Mood entry deleted successfully"}
+    raise HTTPException(status_code=404, detail="Mood entry not found")
 
 @api_router.get("/moods/export/csv")
 async def export_moods_csv():
-    try:
-        moods = await db.mood_entries.find().sort("date", 1).to_list(length=None)
-        
-        # Create CSV content
-        csv_content = "Date,Mood,Emoji,Notes,Timestamp\n"
-        for mood in moods:
-            notes = mood.get('notes', '').replace('"', '""')  # Escape quotes
-            csv_content += f'"{mood["date"]}",{mood["mood"]},"{mood["mood_emoji"]}","{notes}","{mood["timestamp"]}"\n'
-        
-        return {
-            "content": csv_content,
-            "filename": f"mood_data_{datetime.now(timezone.utc).strftime('%Y%m%d')}.csv"
-        }
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    async def generate_rows():
+        buffer = io.StringIO()
+        writer = csv.writer(buffer, quoting=csv.QUOTE_NONNUMERIC, lineterminator="\n")
+        writer.writerow(CSV_HEADER)
+
+        # Larger cursor batches mean fewer getMore round-trips on big histories
+        cursor = db.mood_entries.find({}, MOOD_PROJECTION, batch_size=CSV_BATCH_SIZE).sort("date", 1)
+
+        # Write rows into one buffer and flush it in chunks rather than per row
+        writerow = writer.writerow
+        pending = 0
+        async for mood in cursor:
+            writerow((
+                mood["date"],
+                mood["mood"],
+                mood["mood_emoji"],
+                mood.get("notes") or "",
+                format_timestamp(mood["timestamp"]),
+            ))
+            pending += 1
+            if pending >= CSV_CHUNK_ROWS:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+                pending = 0
+
+        yield buffer.getvalue()
+
+    filename = csv_export_filename(datetime.now(timezone.utc).date())
+    return StreamingResponse(
+        generate_rows(),
+        media_type="text/csv",
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
 
 # Include the router in the main app
 app.include_router(api_router)
@@ -166,6 +266,7 @@ app.add_middleware(
     allow_origins=os.environ.get('CORS_ORIGINS', '*').split(','),
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Content-Disposition"],
 )
 
 # Configure logging
@@ -175,6 +276,55 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+@app.exception_handler(DuplicateKeyError)
+async def handle_duplicate_key(request, exc):
+    # The unique date index: another entry already exists for that day
+    return ORJSONResponse(status_code=409, content={"detail": "A mood entry already exists for that date"})
+
+@app.exception_handler(ConnectionFailure)
+async def handle_database_unavailable(request, exc):
+    logger.error("Database unavailable on %s %s: %s", request.method, request.url.path, exc)
+    return ORJSONResponse(status_code=503, content={"detail": "Database unavailable"})
+
+@app.exception_handler(PyMongoError)
+async def handle_database_error(request, exc):
+    logger.error("Database error on %s %s: %s", request.method, request.url.path, exc)
+    return ORJSONResponse(status_code=500, content={"detail": "Database error"})
+
+@app.on_event("startup")
+async def create_db_indexes():
+    # Index creation must never stop the app from starting; routes report DB errors themselves
+    # One entry per day; also backs the lookup in get_mood_by_date
+    try:
+        await db.mood_entries.create_index("date", unique=True)
+    except OperationFailure as e:
+        # Databases from before the per-day rule can hold duplicate dates
+        logger.error(
+            "Could not create unique index on mood_entries.date (%s); "
+            "run backend/migrate_moods.py to remove duplicate dates", e
+        )
+    except PyMongoError as e:
+        # Database unreachable at boot; don't wait out a second timeout below
+        logger.error("Could not create mood_entries indexes: %s", e)
+        return
+    # Lets the history listing sort newest-first without an in-memory sort
+    try:
+        await db.mood_entries.create_index(MOOD_LIST_SORT)
+    except PyMongoError as e:
+        logger.error("Could not create mood_entries history index: %s", e)
+
 @app.on_event("shutdown")
 async def shutdown_db_client():
-    client.close()
\ No newline at end of file
+    client.close()
+
+if __name__ == "__main__":
+    import uvicorn
+
+    uvicorn.run(
+        "server:app",
+        host=os.environ.get('HOST', '0.0.0.0'),
+        port=int(os.environ.get('PORT', '8001')),
+        loop="uvloop",
+        http="httptools",
+        workers=int(os.environ.get('WEB_CONCURRENCY', '1')),
+    )
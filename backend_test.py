@@ -5,22 +5,12 @@ Tests all backend endpoints with realistic data
 """
 
 import requests
-import json
 from datetime import datetime, timezone, timedelta
 import uuid
 import sys
-import os
+from concurrent.futures import ThreadPoolExecutor
 
-# Get backend URL from frontend .env file
-def get_backend_url():
-    try:
-        with open('/app/frontend/.env', 'r') as f:
-            for line in f:
-                if line.startswith('REACT_APP_BACKEND_URL='):
-                    return line.split('=', 1)[1].strip()
-    except Exception as e:
-        print(f"Error reading frontend .env: {e}")
-        return None
+from test_utils import get_backend_url, delete_mood_on_date
 
 BASE_URL = get_backend_url()
 if not BASE_URL:
@@ -28,6 +18,10 @@ if not BASE_URL:
     sys.exit(1)
 
 API_URL = f"{BASE_URL}/api"
+
+# Reuse one keep-alive connection for every call
+session = requests.Session()
+
 print(f"Testing backend API at: {API_URL}")
 
 # Test data with realistic mood entries
@@ -39,21 +33,33 @@ MOOD_EMOJIS = {
     5: "😄"   # Very happy
 }
 
+# How each mood level is described in the generated notes
+MOOD_LABEL = {1: "down", 2: "down", 3: "okay", 4: "great", 5: "great"}
+DAY_LABEL = {1: "challenging", 2: "challenging", 3: "regular", 4: "wonderful", 5: "wonderful"}
+
+# Creates upsert by date, so test entries live on days no real entry uses
+TEST_BASE_DATE = datetime(1999, 2, 7, tzinfo=timezone.utc)
+TEST_DAYS = 7
+
+TEST_BATCH_DATES = ["1999-03-01", "1999-03-02"]
+
+def test_dates():
+    """Dates used by the test entries, newest first"""
+    return [(TEST_BASE_DATE - timedelta(days=i)).strftime("%Y-%m-%d") for i in range(TEST_DAYS)]
+
 def create_test_mood_entries():
     """Create realistic test mood entries"""
-    today = datetime.now(timezone.utc)
     test_entries = []
     
-    # Create entries for the last 7 days
-    for i in range(7):
-        date_obj = today - timedelta(days=i)
+    # Create entries for seven consecutive test days
+    for i, entry_date in enumerate(test_dates()):
         mood_level = (i % 5) + 1  # Cycle through mood levels 1-5
         
         entry = {
             "mood": mood_level,
             "mood_emoji": MOOD_EMOJIS[mood_level],
-            "notes": f"Feeling {'great' if mood_level >= 4 else 'okay' if mood_level == 3 else 'down'} today. Had a {'wonderful' if mood_level >= 4 else 'regular' if mood_level == 3 else 'challenging'} day.",
-            "date": date_obj.strftime("%Y-%m-%d")
+            "notes": f"Feeling {MOOD_LABEL[mood_level]} today. Had a {DAY_LABEL[mood_level]} day.",
+            "date": entry_date
         }
         test_entries.append(entry)
     
@@ -63,7 +69,7 @@ def test_api_root():
     """Test the API root endpoint"""
     print("\n=== Testing API Root ===")
     try:
-        response = requests.get(f"{API_URL}/")
+        response = session.get(f"{API_URL}/")
         print(f"Status Code: {response.status_code}")
         print(f"Response: {response.json()}")
         return response.status_code == 200
@@ -77,23 +83,31 @@ def test_create_mood_entry():
     test_entries = create_test_mood_entries()
     created_entries = []
     
-    for i, entry in enumerate(test_entries):
+    def post_entry(entry):
         try:
-            print(f"\nCreating entry {i+1}: {entry['date']} - Mood {entry['mood']} {entry['mood_emoji']}")
-            response = requests.post(f"{API_URL}/moods", json=entry)
-            print(f"Status Code: {response.status_code}")
-            
-            if response.status_code == 200:
-                data = response.json()
-                print(f"Created entry ID: {data['id']}")
-                print(f"Timestamp: {data['timestamp']}")
-                created_entries.append(data)
-            else:
-                print(f"ERROR: {response.text}")
-                return False, []
-                
+            return session.post(f"{API_URL}/moods", json=entry)
         except Exception as e:
-            print(f"ERROR creating entry: {e}")
+            return e
+    
+    # Send all creates at once; results come back in submission order
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        responses = list(executor.map(post_entry, test_entries))
+    
+    for i, (entry, response) in enumerate(zip(test_entries, responses)):
+        print(f"\nCreating entry {i+1}: {entry['date']} - Mood {entry['mood']} {entry['mood_emoji']}")
+        if isinstance(response, Exception):
+            print(f"ERROR creating entry: {response}")
+            return False, []
+        
+        print(f"Status Code: {response.status_code}")
+        
+        if response.status_code == 200:
+            data = response.json()
+            print(f"Created entry ID: {data['id']}")
+            print(f"Timestamp: {data['timestamp']}")
+            created_entries.append(data)
+        else:
+            print(f"ERROR: {response.text}")
             return False, []
     
     print(f"\nSuccessfully created {len(created_entries)} mood entries")
@@ -103,7 +117,7 @@ def test_get_all_moods():
     """Test GET /api/moods - Retrieve all mood entries"""
     print("\n=== Testing Get All Mood Entries ===")
     try:
-        response = requests.get(f"{API_URL}/moods")
+        response = session.get(f"{API_URL}/moods")
         print(f"Status Code: {response.status_code}")
         
         if response.status_code == 200:
@@ -129,11 +143,47 @@ def test_get_all_moods():
         print(f"ERROR: {e}")
         return False, []
 
+def test_pagination_and_range():
+    """Test GET /api/moods paging (limit/skip) and date_from/date_to filtering"""
+    print("\n=== Testing Pagination and Date Range ===")
+    dates = test_dates()
+    date_range = {"date_from": min(dates), "date_to": max(dates)}
+    
+    try:
+        response = session.get(f"{API_URL}/moods", params=date_range)
+        print(f"Range Status Code: {response.status_code}")
+        if response.status_code != 200:
+            print(f"ERROR: {response.text}")
+            return False
+        in_range = response.json()
+        range_ok = sorted(mood['date'] for mood in in_range) == sorted(dates)
+        print(f"Range {date_range['date_from']}..{date_range['date_to']} returned {len(in_range)} entries, matches test dates: {range_ok}")
+        
+        first_page = session.get(f"{API_URL}/moods", params={**date_range, "limit": 3}).json()
+        second_page = session.get(f"{API_URL}/moods", params={**date_range, "limit": 3, "skip": 3}).json()
+        page_ids = [mood['id'] for mood in first_page + second_page]
+        pages_ok = (
+            len(first_page) == 3
+            and len(second_page) == 3
+            and page_ids == [mood['id'] for mood in in_range[:6]]
+        )
+        print(f"limit/skip pages are consecutive and non-overlapping: {pages_ok}")
+        
+        response = session.get(f"{API_URL}/moods", params={"date_from": "1999-2-1"})
+        rejects_bad_date = response.status_code == 422
+        print(f"Malformed date_from rejected with 422: {rejects_bad_date} (status {response.status_code})")
+        
+        return range_ok and pages_ok and rejects_bad_date
+        
+    except Exception as e:
+        print(f"ERROR: {e}")
+        return False
+
 def test_get_mood_by_date(test_date):
     """Test GET /api/moods/{date} - Get mood by specific date"""
     print(f"\n=== Testing Get Mood by Date: {test_date} ===")
     try:
-        response = requests.get(f"{API_URL}/moods/{test_date}")
+        response = session.get(f"{API_URL}/moods/{test_date}")
         print(f"Status Code: {response.status_code}")
         
         if response.status_code == 200:
@@ -153,7 +203,7 @@ def test_get_mood_by_date(test_date):
         print(f"ERROR: {e}")
         return False, None
 
-def test_update_mood_entry(mood_id):
+def test_update_mood_entry(mood_id, mood_date):
     """Test PUT /api/moods/{mood_id} - Update existing mood entry"""
     print(f"\n=== Testing Update Mood Entry: {mood_id} ===")
     
@@ -161,11 +211,11 @@ def test_update_mood_entry(mood_id):
         "mood": 5,
         "mood_emoji": "😄",
         "notes": "Updated: Feeling amazing after testing the API!",
-        "date": datetime.now(timezone.utc).strftime("%Y-%m-%d")
+        "date": mood_date
     }
     
     try:
-        response = requests.put(f"{API_URL}/moods/{mood_id}", json=updated_data)
+        response = session.put(f"{API_URL}/moods/{mood_id}", json=updated_data)
         print(f"Status Code: {response.status_code}")
         
         if response.status_code == 200:
@@ -181,17 +231,66 @@ def test_update_mood_entry(mood_id):
         print(f"ERROR: {e}")
         return False, None
 
+def test_batch_create():
+    """Test POST /api/moods/batch - Bulk create, then re-send to check it upserts by date"""
+    print("\n=== Testing Batch Mood Entry Creation ===")
+    
+    batch = [
+        {
+            "mood": 2,
+            "mood_emoji": MOOD_EMOJIS[2],
+            "notes": f"Batch entry for {entry_date}",
+            "date": entry_date
+        }
+        for entry_date in TEST_BATCH_DATES
+    ]
+    
+    try:
+        response = session.post(f"{API_URL}/moods/batch", json=batch)
+        print(f"Status Code: {response.status_code}")
+        if response.status_code != 200:
+            print(f"ERROR: {response.text}")
+            return False
+        
+        created = response.json()
+        print(f"Created {len(created)} entries in one request")
+        if [mood['date'] for mood in created] != TEST_BATCH_DATES:
+            print(f"ERROR: Expected dates {TEST_BATCH_DATES}, got {[mood['date'] for mood in created]}")
+            return False
+        
+        # Sending the same dates again should update those entries, keeping their ids
+        batch[0]["mood"] = 4
+        batch[0]["mood_emoji"] = MOOD_EMOJIS[4]
+        response = session.post(f"{API_URL}/moods/batch", json=batch)
+        print(f"Re-send Status Code: {response.status_code}")
+        if response.status_code != 200:
+            print(f"ERROR: {response.text}")
+            return False
+        
+        updated = response.json()
+        same_ids = [mood['id'] for mood in updated] == [mood['id'] for mood in created]
+        print(f"Entries kept their ids: {same_ids}")
+        print(f"First entry mood after re-send: {updated[0]['mood']}")
+        return same_ids and updated[0]['mood'] == 4
+        
+    except Exception as e:
+        print(f"ERROR: {e}")
+        return False
+    finally:
+        for entry_date in TEST_BATCH_DATES:
+            delete_mood_on_date(session, API_URL, entry_date)
+
 def test_csv_export():
     """Test GET /api/moods/export/csv - Export mood data as CSV"""
     print("\n=== Testing CSV Export ===")
     try:
-        response = requests.get(f"{API_URL}/moods/export/csv")
+        response = session.get(f"{API_URL}/moods/export/csv")
         print(f"Status Code: {response.status_code}")
         
         if response.status_code == 200:
-            data = response.json()
-            csv_content = data.get('content', '')
-            filename = data.get('filename', '')
+            csv_content = response.text
+            disposition = response.headers.get('content-disposition', '')
+            filename = disposition.split('filename=', 1)[-1].strip('"') if 'filename=' in disposition else ''
             
             print(f"CSV filename: {filename}")
             print(f"CSV content length: {len(csv_content)} characters")
@@ -212,7 +311,7 @@ def test_csv_export():
                 if len(lines) > 1:
                     print(f"First data row: {lines[1]}")
                     
-            return True, data
+            return True, csv_content
         else:
             print(f"ERROR: {response.text}")
             return False, None
@@ -235,7 +334,7 @@ def test_error_handling():
     }
     
     try:
-        response = requests.post(f"{API_URL}/moods", json=invalid_entry)
+        response = session.post(f"{API_URL}/moods", json=invalid_entry)
         print(f"Status Code: {response.status_code}")
         print(f"Response: {response.text}")
     except Exception as e:
@@ -252,7 +351,7 @@ def test_error_handling():
     }
     
     try:
-        response = requests.put(f"{API_URL}/moods/{fake_id}", json=update_data)
+        response = session.put(f"{API_URL}/moods/{fake_id}", json=update_data)
         print(f"Status Code: {response.status_code}")
         print(f"Response: {response.text}")
     except Exception as e:
@@ -269,8 +368,10 @@ def main():
         "api_root": False,
         "create_moods": False,
         "get_all_moods": False,
+        "pagination": False,
         "get_mood_by_date": False,
         "update_mood": False,
+        "batch_create": False,
         "csv_export": False
     }
     
@@ -286,6 +387,9 @@ def main():
         get_all_success, all_moods = test_get_all_moods()
         results["get_all_moods"] = get_all_success
         
+        # Test paging and date range filtering
+        results["pagination"] = test_pagination_and_range()
+        
         # Test getting mood by date
         test_date = created_entries[0]['date']
         get_by_date_success, mood_by_date = test_get_mood_by_date(test_date)
@@ -293,9 +397,12 @@ def main():
         
         # Test updating a mood entry
         mood_id = created_entries[0]['id']
-        update_success, updated_mood = test_update_mood_entry(mood_id)
+        update_success, updated_mood = test_update_mood_entry(mood_id, created_entries[0]['date'])
         results["update_mood"] = update_success
         
+        # Test batch creation
+        results["batch_create"] = test_batch_create()
+        
         # Test CSV export
         csv_success, csv_data = test_csv_export()
         results["csv_export"] = csv_success
@@ -303,6 +410,10 @@ def main():
     # Test error handling
     test_error_handling()
     
+    # Remove the test entries
+    for test_date in test_dates():
+        delete_mood_on_date(session, API_URL, test_date)
+    
     # Print final results
     print("\n" + "=" * 60)
     print("TEST RESULTS SUMMARY")
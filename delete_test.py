@@ -4,23 +4,18 @@ Test DELETE endpoint for Moodify API
 """
 
 import requests
-import json
-from datetime import datetime, timezone
 
-# Get backend URL
-def get_backend_url():
-    try:
-        with open('/app/frontend/.env', 'r') as f:
-            for line in f:
-                if line.startswith('REACT_APP_BACKEND_URL='):
-                    return line.split('=', 1)[1].strip()
-    except Exception as e:
-        print(f"Error reading frontend .env: {e}")
-        return None
+from test_utils import get_backend_url, delete_mood_on_date
 
 BASE_URL = get_backend_url()
 API_URL = f"{BASE_URL}/api"
 
+# Reuse one keep-alive connection for every call
+session = requests.Session()
+
+# Creates upsert by date, so use a day no real entry will ever have
+TEST_DATE = "1999-01-01"
+
 def test_delete_endpoint():
     """Test DELETE /api/moods/{mood_id} endpoint"""
     print("=== Testing DELETE Endpoint ===")
@@ -30,12 +25,12 @@ def test_delete_endpoint():
         "mood": 4,
         "mood_emoji": "😊",
         "notes": "This entry will be deleted",
-        "date": datetime.now(timezone.utc).strftime("%Y-%m-%d")
+        "date": TEST_DATE
     }
     
     try:
         # Create entry
-        response = requests.post(f"{API_URL}/moods", json=entry)
+        response = session.post(f"{API_URL}/moods", json=entry)
         if response.status_code != 200:
             print(f"Failed to create test entry: {response.status_code}")
             return False
@@ -45,7 +40,7 @@ def test_delete_endpoint():
         print(f"Created test entry with ID: {mood_id}")
         
         # Delete the entry
-        delete_response = requests.delete(f"{API_URL}/moods/{mood_id}")
+        delete_response = session.delete(f"{API_URL}/moods/{mood_id}")
         print(f"Delete status: {delete_response.status_code}")
         
         if delete_response.status_code == 200:
@@ -53,7 +48,7 @@ def test_delete_endpoint():
             print(f"Delete response: {result}")
             
             # Verify it's actually deleted by trying to get it by date
-            get_response = requests.get(f"{API_URL}/moods/{entry['date']}")
+            get_response = session.get(f"{API_URL}/moods/{entry['date']}")
             if get_response.status_code == 200:
                 mood_data = get_response.json()
                 if mood_data is None:
@@ -72,6 +67,8 @@ def test_delete_endpoint():
     except Exception as e:
         print(f"Error testing delete: {e}")
         return False
+    finally:
+        delete_mood_on_date(session, API_URL, TEST_DATE)
 
 if __name__ == "__main__":
     success = test_delete_endpoint()
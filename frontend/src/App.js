@@ -4,6 +4,8 @@ import axios from "axios";
 
 const BACKEND_URL = process.env.REACT_APP_BACKEND_URL;
 const API = `${BACKEND_URL}/api`;
+// Largest page GET /api/moods will return
+const MOODS_PAGE_SIZE = 1000;
 
 const MOODS = [
   { value: 1, emoji: "😢", label: "Very Sad", color: "bg-red-500" },
@@ -32,8 +34,16 @@ function App() {
   const fetchMoodEntries = async () => {
     try {
       setIsLoading(true);
-      const response = await axios.get(`${API}/moods`);
-      setMoodEntries(response.data);
+      // The API pages its results; keep fetching until a short page marks the end
+      const entries = [];
+      for (let skip = 0; ; skip += MOODS_PAGE_SIZE) {
+        const response = await axios.get(`${API}/moods`, {
+          params: { limit: MOODS_PAGE_SIZE, skip }
+        });
+        entries.push(...response.data);
+        if (response.data.length < MOODS_PAGE_SIZE) break;
+      }
+      setMoodEntries(entries);
     } catch (error) {
       console.error('Error fetching mood entries:', error);
     } finally {
@@ -92,14 +102,19 @@ function App() {
   const exportData = async () => {
     try {
       setIsLoading(true);
-      const response = await axios.get(`${API}/moods/export/csv`);
+      const response = await axios.get(`${API}/moods/export/csv`, { responseType: 'blob' });
+      
+      // Pull the filename out of the Content-Disposition header
+      const disposition = response.headers['content-disposition'] || '';
+      const match = disposition.match(/filename="?([^"]+)"?/);
+      const filename = match ? match[1] : 'mood_data.csv';
       
       // Create and download file
-      const blob = new Blob([response.data.content], { type: 'text/csv' });
+      const blob = new Blob([response.data], { type: 'text/csv' });
       const url = window.URL.createObjectURL(blob);
       const a = document.createElement('a');
       a.href = url;
-      a.download = response.data.filename;
+      a.download = filename;
       document.body.appendChild(a);
       a.click();
       document.body.removeChild(a);
@@ -0,0 +1,28 @@
+#!/usr/bin/env python3
+"""
+Shared helpers for the Moodify API test scripts
+"""
+
+import functools
+
+# Get backend URL from frontend .env file; read once per process
+@functools.lru_cache(maxsize=1)
+def get_backend_url():
+    try:
+        with open('/app/frontend/.env', 'r') as f:
+            for line in f:
+                if line.startswith('REACT_APP_BACKEND_URL='):
+                    return line.split('=', 1)[1].strip()
+    except Exception as e:
+        print(f"Error reading frontend .env: {e}")
+        return None
+
+def delete_mood_on_date(session, api_url, date_str):
+    """Remove the entry stored for date_str, if any, so test dates leave no trace"""
+    try:
+        response = session.get(f"{api_url}/moods/{date_str}")
+        mood = response.json() if response.status_code == 200 else None
+        if mood:
+            session.delete(f"{api_url}/moods/{mood['id']}")
+    except Exception as e:
+        print(f"Error cleaning up test entry for {date_str}: {e}")
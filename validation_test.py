@@ -4,23 +4,33 @@ Additional validation and edge case testing for Moodify API
 """
 
 import requests
-import json
-from datetime import datetime, timezone
+from concurrent.futures import ThreadPoolExecutor
 
-# Get backend URL
-def get_backend_url():
-    try:
-        with open('/app/frontend/.env', 'r') as f:
-            for line in f:
-                if line.startswith('REACT_APP_BACKEND_URL='):
-                    return line.split('=', 1)[1].strip()
-    except Exception as e:
-        print(f"Error reading frontend .env: {e}")
-        return None
+from test_utils import get_backend_url, delete_mood_on_date
 
 BASE_URL = get_backend_url()
 API_URL = f"{BASE_URL}/api"
 
+# Reuse one keep-alive connection for every call
+session = requests.Session()
+
+# Creates upsert by date, so accepted test entries go on days no real entry uses
+TEST_DATE = "1999-01-02"
+VALID_FORMAT_TEST_DATE = "1999-01-03"
+# One date per mood-range case, so concurrent accepted POSTs never race on the same upsert
+MOOD_TEST_DATES = [f"1999-01-{day:02d}" for day in range(11, 18)]
+
+def post_moods(entries):
+    """POST entries concurrently, returning a response or exception per entry in order"""
+    def post_entry(entry):
+        try:
+            return session.post(f"{API_URL}/moods", json=entry)
+        except Exception as e:
+            return e
+    
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        return list(executor.map(post_entry, entries))
+
 def test_mood_validation():
     """Test mood value validation"""
     print("=== Testing Mood Value Validation ===")
@@ -38,26 +48,28 @@ def test_mood_validation():
     
     validation_issues = []
     
-    for mood_value, should_pass in test_cases:
-        entry = {
+    entries = [
+        {
             "mood": mood_value,
             "mood_emoji": "😐",
             "notes": f"Testing mood value {mood_value}",
-            "date": datetime.now(timezone.utc).strftime("%Y-%m-%d")
+            "date": test_date
         }
+        for (mood_value, _), test_date in zip(test_cases, MOOD_TEST_DATES)
+    ]
+    
+    for (mood_value, should_pass), response in zip(test_cases, post_moods(entries)):
+        if isinstance(response, Exception):
+            print(f"Error testing mood {mood_value}: {response}")
+            validation_issues.append(f"Mood {mood_value}: Exception - {response}")
+            continue
         
-        try:
-            response = requests.post(f"{API_URL}/moods", json=entry)
-            passed = response.status_code == 200
-            
-            print(f"Mood {mood_value}: Status {response.status_code} - {'PASS' if passed == should_pass else 'VALIDATION ISSUE'}")
-            
-            if passed != should_pass:
-                validation_issues.append(f"Mood {mood_value}: Expected {'pass' if should_pass else 'fail'}, got {'pass' if passed else 'fail'}")
-                
-        except Exception as e:
-            print(f"Error testing mood {mood_value}: {e}")
-            validation_issues.append(f"Mood {mood_value}: Exception - {e}")
+        passed = response.status_code == 200
+        
+        print(f"Mood {mood_value}: Status {response.status_code} - {'PASS' if passed == should_pass else 'VALIDATION ISSUE'}")
+        
+        if passed != should_pass:
+            validation_issues.append(f"Mood {mood_value}: Expected {'pass' if should_pass else 'fail'}, got {'pass' if passed else 'fail'}")
     
     return validation_issues
 
@@ -71,11 +83,11 @@ def test_required_fields():
     entry_no_mood = {
         "mood_emoji": "😐",
         "notes": "Missing mood field",
-        "date": datetime.now(timezone.utc).strftime("%Y-%m-%d")
+        "date": TEST_DATE
     }
     
     try:
-        response = requests.post(f"{API_URL}/moods", json=entry_no_mood)
+        response = session.post(f"{API_URL}/moods", json=entry_no_mood)
         if response.status_code == 200:
             validation_issues.append("Missing mood field was accepted (should be rejected)")
         print(f"Missing mood field: Status {response.status_code}")
@@ -86,11 +98,11 @@ def test_required_fields():
     entry_no_emoji = {
         "mood": 3,
         "notes": "Missing emoji field",
-        "date": datetime.now(timezone.utc).strftime("%Y-%m-%d")
+        "date": TEST_DATE
     }
     
     try:
-        response = requests.post(f"{API_URL}/moods", json=entry_no_emoji)
+        response = session.post(f"{API_URL}/moods", json=entry_no_emoji)
         if response.status_code == 200:
             validation_issues.append("Missing mood_emoji field was accepted (should be rejected)")
         print(f"Missing emoji field: Status {response.status_code}")
@@ -105,7 +117,7 @@ def test_required_fields():
     }
     
     try:
-        response = requests.post(f"{API_URL}/moods", json=entry_no_date)
+        response = session.post(f"{API_URL}/moods", json=entry_no_date)
         if response.status_code == 200:
             validation_issues.append("Missing date field was accepted (should be rejected)")
         print(f"Missing date field: Status {response.status_code}")
@@ -122,33 +134,35 @@ def test_date_formats():
     
     # Test cases: (date_value, should_pass, description)
     date_test_cases = [
-        ("2025-09-22", True, "Valid ISO date"),
+        (VALID_FORMAT_TEST_DATE, True, "Valid ISO date"),
         ("2025-13-01", False, "Invalid month"),
         ("2025-02-30", False, "Invalid day for February"),
         ("invalid-date", False, "Invalid format"),
         ("", False, "Empty date"),
     ]
     
-    for date_value, should_pass, description in date_test_cases:
-        entry = {
+    entries = [
+        {
             "mood": 3,
             "mood_emoji": "😐",
             "notes": f"Testing {description}",
             "date": date_value
         }
+        for date_value, _, description in date_test_cases
+    ]
+    
+    for (date_value, should_pass, description), response in zip(date_test_cases, post_moods(entries)):
+        if isinstance(response, Exception):
+            print(f"Error testing {description}: {response}")
+            date_issues.append(f"{description}: Exception - {response}")
+            continue
         
-        try:
-            response = requests.post(f"{API_URL}/moods", json=entry)
-            passed = response.status_code == 200
-            
-            print(f"{description}: Status {response.status_code} - {'PASS' if passed == should_pass else 'ISSUE'}")
-            
-            if passed != should_pass:
-                date_issues.append(f"{description}: Expected {'pass' if should_pass else 'fail'}, got {'pass' if passed else 'fail'}")
-                
-        except Exception as e:
-            print(f"Error testing {description}: {e}")
-            date_issues.append(f"{description}: Exception - {e}")
+        passed = response.status_code == 200
+        
+        print(f"{description}: Status {response.status_code} - {'PASS' if passed == should_pass else 'ISSUE'}")
+        
+        if passed != should_pass:
+            date_issues.append(f"{description}: Expected {'pass' if should_pass else 'fail'}, got {'pass' if passed else 'fail'}")
     
     return date_issues
 
@@ -172,6 +186,10 @@ def main():
     date_issues = test_date_formats()
     all_issues.extend(date_issues)
     
+    # Remove the entries the accepted cases created
+    for test_date in (TEST_DATE, VALID_FORMAT_TEST_DATE, *MOOD_TEST_DATES):
+        delete_mood_on_date(session, API_URL, test_date)
+    
     # Summary
     print("\n" + "=" * 60)
     print("VALIDATION TEST RESULTS")